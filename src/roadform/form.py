@@ -6,14 +6,57 @@ Build and validate forms with fields, rules, and rendering.
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Type
+from functools import lru_cache
+from operator import is_
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 import html
 import json
 import logging
 import re
+import sys
+
+try:
+    import re2 as _re_backend
+except ImportError:  # google-re2 is optional
+    _re_backend = re
 
 logger = logging.getLogger(__name__)
 
+# Matched with fullmatch(); the bounded repeats cap backtracking on long inputs without a valid domain.
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]{1,254}@[a-zA-Z0-9.-]{1,254}\.[a-zA-Z]{2,}')
+_URL_RE = re.compile(r'https?://[^\s/$.?#].[^\s]*')
+
+# Attribute values are always double-quoted, so single quotes need no escaping.
+_HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+
+def _as_str(value: Any) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+def _pct(text: str) -> str:
+    return text.replace("%", "%%")
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(regex: Any) -> Any:
+    """Compile a user-supplied PATTERN regex, preferring linear-time RE2 when installed.
+
+    Returns an re.Pattern or an re2 pattern object; both provide match() and fullmatch().
+    Patterns outside RE2's syntax (backreferences, lookaround) fall back to the re module.
+    Already-compiled patterns are returned unchanged.
+    """
+    if not isinstance(regex, str):
+        return regex
+    if _re_backend is not re:
+        # RE2 can match differently from re even for patterns both accept: `$` does not
+        # match before a trailing newline, and \d, \w, \s only match ASCII characters.
+        try:
+            return _re_backend.compile(regex)
+        except _re_backend.error:
+            logger.debug("Pattern %r not supported by re2, using re", regex)
+    return re.compile(regex)
+
 
 class FieldType(str, Enum):
     TEXT = "text"
@@ -41,15 +84,24 @@ class ValidationRule(str, Enum):
     PATTERN = "pattern"
     CUSTOM = "custom"
 
+# Rules whose validators always pass on an empty value, so validate() can skip them outright.
+_EMPTY_SAFE_RULES = frozenset({
+    ValidationRule.EMAIL,
+    ValidationRule.URL,
+    ValidationRule.MIN_LENGTH,
+    ValidationRule.MAX_LENGTH,
+    ValidationRule.PATTERN,
+})
+
 
-@dataclass
+@dataclass(slots=True)
 class ValidationError:
     field: str
     rule: str
     message: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FieldOption:
     value: str
     label: str
@@ -57,8 +109,14 @@ class FieldOption:
     disabled: bool = False
 
 
-@dataclass
-class FormField:
+class _FieldState:
+    # Derived render and validation caches, kept as plain slots so they stay out of
+    # dataclasses.fields(), asdict(), repr() and equality on FormField.
+    __slots__ = ("_attrs_str", "_template", "_render_key", "_skips_empty", "_bound_validators", "_validators_seen")
+
+
+@dataclass(slots=True)
+class FormField(_FieldState):
     name: str
     type: FieldType = FieldType.TEXT
     label: str = ""
@@ -68,16 +126,119 @@ class FormField:
     disabled: bool = False
     readonly: bool = False
     options: List[FieldOption] = field(default_factory=list)
-    validators: List[tuple] = field(default_factory=list)
+    validators: Tuple[tuple, ...] = ()
     attributes: Dict[str, str] = field(default_factory=dict)
     help_text: str = ""
 
+    def __post_init__(self):
+        # Normalize plain strings to enum members so hot paths can compare by identity.
+        self.type = FieldType(self.type)
+        # Interned keys let dict lookups on field names and attributes hit the identity fast path.
+        self.name = sys.intern(self.name)
+        self.attributes = {sys.intern(k): v for k, v in self.attributes.items()}
+        self.invalidate()
+
+    def invalidate(self) -> "FormField":
+        """Force cached render state and validator bindings to be rebuilt."""
+        self._render_key = None
+        self._template = None
+        self._bind_validators()
+        return self
+
+    def _refresh_render_state(self) -> bool:
+        """Recompile the cached markup if anything it is rendered from changed; returns True when it did.
+
+        Options and default are part of the key because they feed the form's cached empty render.
+        """
+        key = (self.type, self.name, self.label, self.placeholder, self.required, self.disabled,
+               self.readonly, self.help_text, tuple(self.attributes.items()),
+               tuple((opt.value, opt.label) for opt in self.options), self.default)
+        if key == self._render_key:
+            return False
+        self._render_key = key
+        self._attrs_str = " ".join(f'{k}="{html.escape(_as_str(v), quote=True)}"' for k, v in self.attributes.items())
+        self._template = self._compile_template()
+        return True
+
+    def _bind_validators(self) -> None:
+        self.validators = tuple(self._normalize_validator(*entry) for entry in self.validators)
+        self._skips_empty = all(rule in _EMPTY_SAFE_RULES for rule, _, _ in self.validators)
+        self._bound_validators = []
+        for rule, param, message in self.validators:
+            self._bind_validator(rule, param, message)
+        self._validators_seen = self.validators
+
+    def _sync_validators(self) -> None:
+        """Rebind if `validators` was reassigned instead of extended through add_validator.
+
+        validators is stored as a tuple, so it cannot change in place and an identity check suffices.
+        """
+        if self.validators is not self._validators_seen:
+            self._bind_validators()
+
     def add_validator(self, rule: ValidationRule, value: Any = None, message: str = None) -> "FormField":
-        self.validators.append((rule, value, message))
+        rule, value, message = self._normalize_validator(rule, value, message)
+        self._sync_validators()
+        self.validators += ((rule, value, message),)
+        self._validators_seen = self.validators
+        self._skips_empty = self._skips_empty and rule in _EMPTY_SAFE_RULES
+        self._bind_validator(rule, value, message)
         return self
 
+    @staticmethod
+    def _normalize_validator(rule: ValidationRule, param: Any, message: Optional[str]) -> tuple:
+        """Coerce the rule to a ValidationRule and compile str PATTERN params so entries can be used directly."""
+        rule = ValidationRule(rule)
+        if rule is ValidationRule.PATTERN and isinstance(param, str):
+            param = _compile_pattern(param)
+        return rule, param, message
+
+    def _bind_validator(self, rule: ValidationRule, param: Any, message: Optional[str]) -> None:
+        """Specialize a validator into a one-argument check; its default message is formatted on failure."""
+        if rule is ValidationRule.CUSTOM:
+            if not callable(param):
+                return
+            check = param
+        else:
+            fn, takes_param = _RULE_DISPATCH[rule]
+            check = (lambda value, fn=fn, param=param: fn(value, param)) if takes_param else fn
+        self._bound_validators.append((check, rule, param, message))
+
+    def _compile_template(self) -> str:
+        """Prerender this field's markup, leaving a single %s slot for the escaped value.
+
+        Returns "" for select and checkbox fields, whose markup depends on the value itself.
+        """
+        if self.type is FieldType.SELECT or self.type is FieldType.CHECKBOX:
+            return ""
 
-@dataclass
+        name = _pct(self.name)
+        if self.type is FieldType.HIDDEN:
+            return f'<input type="hidden" name="{name}" value="%s">'
+
+        attrs = _pct(self._attrs_str)
+        placeholder = _pct(self.placeholder)
+        required = " required" if self.required else ""
+        disabled = " disabled" if self.disabled else ""
+        readonly = " readonly" if self.readonly else ""
+
+        parts = ['<div class="form-group">']
+        if self.label:
+            parts.append(f'<label for="{name}">{_pct(self.label)}</label>')
+
+        if self.type is FieldType.TEXTAREA:
+            parts.append(f'<textarea name="{name}" id="{name}" placeholder="{placeholder}"{required}{disabled}{readonly} {attrs}>%s</textarea>')
+        else:
+            parts.append(f'<input type="{self.type.value}" name="{name}" id="{name}" value="%s" placeholder="{placeholder}"{required}{disabled}{readonly} {attrs}>')
+
+        if self.help_text:
+            parts.append(f'<small>{_pct(self.help_text)}</small>')
+
+        parts.append('</div>')
+        return "\n".join(parts)
+
+
+@dataclass(slots=True)
 class FormData:
     fields: Dict[str, Any]
     valid: bool = True
@@ -97,27 +258,25 @@ class FieldValidator:
     def email(value: str) -> bool:
         if not value:
             return True
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, str(value)))
+        return bool(_EMAIL_RE.fullmatch(_as_str(value)))
 
     @staticmethod
     def url(value: str) -> bool:
         if not value:
             return True
-        pattern = r'^https?://[^\s/$.?#].[^\s]*$'
-        return bool(re.match(pattern, str(value)))
+        return bool(_URL_RE.fullmatch(_as_str(value)))
 
     @staticmethod
     def min_length(value: str, min_len: int) -> bool:
         if not value:
             return True
-        return len(str(value)) >= min_len
+        return (len(value) if isinstance(value, str) else len(str(value))) >= min_len
 
     @staticmethod
     def max_length(value: str, max_len: int) -> bool:
         if not value:
             return True
-        return len(str(value)) <= max_len
+        return (len(value) if isinstance(value, str) else len(str(value))) <= max_len
 
     @staticmethod
     def min_value(value: float, min_val: float) -> bool:
@@ -135,7 +294,49 @@ class FieldValidator:
     def pattern(value: str, regex: str) -> bool:
         if not value:
             return True
-        return bool(re.match(regex, str(value)))
+        return bool(_compile_pattern(regex).match(_as_str(value)))
+
+
+def _match_compiled(value: str, pattern: Any) -> bool:
+    if not value:
+        return True
+    return bool(pattern.match(_as_str(value)))
+
+
+# Default error messages, formatted with the field label and rule param only when a check fails.
+_DEFAULT_MSGS: Dict[ValidationRule, str] = {
+    ValidationRule.REQUIRED: "{label} is required",
+    ValidationRule.EMAIL: "Invalid email address",
+    ValidationRule.URL: "Invalid URL",
+    ValidationRule.MIN_LENGTH: "Minimum length is {param}",
+    ValidationRule.MAX_LENGTH: "Maximum length is {param}",
+    ValidationRule.MIN_VALUE: "Minimum value is {param}",
+    ValidationRule.MAX_VALUE: "Maximum value is {param}",
+    ValidationRule.PATTERN: "Invalid format",
+    ValidationRule.CUSTOM: "{label} validation failed",
+}
+
+# rule -> (validator, takes param)
+_RULE_DISPATCH: Dict[ValidationRule, Tuple[Callable, bool]] = {
+    ValidationRule.REQUIRED: (FieldValidator.required, False),
+    ValidationRule.EMAIL: (FieldValidator.email, False),
+    ValidationRule.URL: (FieldValidator.url, False),
+    ValidationRule.MIN_LENGTH: (FieldValidator.min_length, True),
+    ValidationRule.MAX_LENGTH: (FieldValidator.max_length, True),
+    ValidationRule.MIN_VALUE: (FieldValidator.min_value, True),
+    ValidationRule.MAX_VALUE: (FieldValidator.max_value, True),
+    ValidationRule.PATTERN: (_match_compiled, True),
+}
+
+# rules validate_batch can run as a bare regex match over a column
+_RULE_MATCHERS: Dict[ValidationRule, Callable] = {
+    ValidationRule.EMAIL: _EMAIL_RE.fullmatch,
+    ValidationRule.URL: _URL_RE.fullmatch,
+}
+
+
+def _default_msg(field: FormField, rule: ValidationRule, param: Any) -> str:
+    return _DEFAULT_MSGS[rule].format(label=field.label or field.name, param=param)
 
 
 class Form:
@@ -146,11 +347,60 @@ class Form:
         self.action = ""
         self.enctype = "application/x-www-form-urlencoded"
         self.attributes: Dict[str, str] = {}
+        self._dirty = True
+        self._cached_empty_html: Optional[str] = None
+        self._cached_empty_key: Optional[tuple] = None
+        self._compiled_template: Optional[str] = None
+        self._compiled_slots: List[Tuple[str, FormField, bool]] = []
+        self._compiled_names: List[str] = []
+        self._compiled_fields: List[FormField] = []
 
     def add_field(self, field: FormField) -> "Form":
         self.fields[field.name] = field
+        self._dirty = True
+        self._compiled_template = None
+        return self
+
+    def invalidate(self) -> "Form":
+        """Drop cached render state after mutating the form or its fields."""
+        for field in self.fields.values():
+            field.invalidate()
+        self._dirty = True
+        self._compiled_template = None
         return self
 
+    def finalize(self) -> "Form":
+        """Compile the whole form into one %-template with a slot per field.
+
+        Called lazily by render_html; add_field and invalidate discard the compiled template.
+        The <form> tag gets its own slot so name, method, action and enctype are read at render time.
+        """
+        parts = ["%s"]
+        slots = []
+
+        for name, field in self.fields.items():
+            field._refresh_render_state()
+            template = field._template
+            # Fields without a template (select, checkbox) are rendered in full into their slot.
+            parts.append(template or "%s")
+            slots.append((name, field, bool(template)))
+
+        parts.append('<button type="submit">Submit</button>')
+        parts.append('</form>')
+        self._compiled_template = "\n".join(parts)
+        self._compiled_slots = slots
+        self._dirty = True
+        self._compiled_names = list(self.fields)
+        self._compiled_fields = list(self.fields.values())
+        return self
+
+    def _fields_changed(self) -> bool:
+        """Whether `fields` was edited directly since the template was compiled."""
+        fields = self.fields
+        return (len(fields) != len(self._compiled_fields)
+                or not all(map(is_, fields, self._compiled_names))
+                or not all(map(is_, fields.values(), self._compiled_fields)))
+
     def text(self, name: str, label: str = "", **kwargs) -> "Form":
         return self.add_field(FormField(name=name, type=FieldType.TEXT, label=label or name.title(), **kwargs))
 
@@ -184,98 +434,140 @@ class Form:
     def validate(self, data: Dict[str, Any]) -> FormData:
         errors = []
         validated = {}
+        data_get = data.get
+        is_present = FieldValidator.required
+        add_error = errors.append
 
         for name, field in self.fields.items():
-            value = data.get(name, field.default)
+            value = data_get(name, field.default)
 
-            if field.required and not FieldValidator.required(value):
-                errors.append(ValidationError(name, "required", f"{field.label or name} is required"))
+            if field.required and not is_present(value):
+                add_error(ValidationError(name, "required", _default_msg(field, ValidationRule.REQUIRED, None)))
                 continue
 
-            for rule, param, message in field.validators:
-                valid = True
-                default_msg = f"{field.label or name} validation failed"
-
-                if rule == ValidationRule.REQUIRED:
-                    valid = FieldValidator.required(value)
-                    default_msg = f"{field.label or name} is required"
-                elif rule == ValidationRule.EMAIL:
-                    valid = FieldValidator.email(value)
-                    default_msg = "Invalid email address"
-                elif rule == ValidationRule.URL:
-                    valid = FieldValidator.url(value)
-                    default_msg = "Invalid URL"
-                elif rule == ValidationRule.MIN_LENGTH:
-                    valid = FieldValidator.min_length(value, param)
-                    default_msg = f"Minimum length is {param}"
-                elif rule == ValidationRule.MAX_LENGTH:
-                    valid = FieldValidator.max_length(value, param)
-                    default_msg = f"Maximum length is {param}"
-                elif rule == ValidationRule.MIN_VALUE:
-                    valid = FieldValidator.min_value(value, param)
-                    default_msg = f"Minimum value is {param}"
-                elif rule == ValidationRule.MAX_VALUE:
-                    valid = FieldValidator.max_value(value, param)
-                    default_msg = f"Maximum value is {param}"
-                elif rule == ValidationRule.PATTERN:
-                    valid = FieldValidator.pattern(value, param)
-                    default_msg = "Invalid format"
-                elif rule == ValidationRule.CUSTOM and callable(param):
-                    valid = param(value)
-
-                if not valid:
-                    errors.append(ValidationError(name, rule.value, message or default_msg))
+            field._sync_validators()
+            if not value and field._skips_empty:
+                validated[name] = value
+                continue
+
+            for check, rule, param, message in field._bound_validators:
+                if not check(value):
+                    add_error(ValidationError(name, rule.value, message or _default_msg(field, rule, param)))
 
             validated[name] = value
 
         return FormData(fields=validated, valid=len(errors) == 0, errors=errors)
 
-    def render_html(self, data: Dict[str, Any] = None) -> str:
-        data = data or {}
-        parts = [f'<form name="{self.name}" method="{self.method}" action="{self.action}" enctype="{self.enctype}">']
+    def validate_batch(self, rows: List[Dict[str, Any]]) -> List[FormData]:
+        """Validate many submissions at once, running each validator over a whole column of values."""
+        errors: List[List[ValidationError]] = [[] for _ in rows]
+        validated: List[Dict[str, Any]] = [{} for _ in rows]
 
         for name, field in self.fields.items():
-            value = data.get(name, field.default) or ""
-            parts.append(self._render_field(field, value))
-
-        parts.append('<button type="submit">Submit</button>')
-        parts.append('</form>')
-        return "\n".join(parts)
+            column = [row.get(name, field.default) for row in rows]
+            active = range(len(rows))
+
+            if field.required:
+                required = FieldValidator.required
+                present = [required(value) for value in column]
+                if not all(present):
+                    msg = _default_msg(field, ValidationRule.REQUIRED, None)
+                    for i, ok in enumerate(present):
+                        if not ok:
+                            errors[i].append(ValidationError(name, "required", msg))
+                active = [i for i, ok in enumerate(present) if ok]
+
+            values = [column[i] for i in active]
+            field._sync_validators()
+            for rule, param, message in field.validators:
+                if rule is ValidationRule.CUSTOM:
+                    results = [param(v) for v in values] if callable(param) else None
+                else:
+                    fn, takes_param = _RULE_DISPATCH[rule]
+                    match = param.match if rule is ValidationRule.PATTERN else _RULE_MATCHERS.get(rule)
+                    if match is not None:
+                        results = [bool(match(_as_str(v))) if v else True for v in values]
+                    elif takes_param:
+                        results = [fn(v, param) for v in values]
+                    else:
+                        results = [fn(v) for v in values]
+
+                if results is None or all(results):
+                    continue
+                msg = message or _default_msg(field, rule, param)
+                for i, ok in zip(active, results):
+                    if not ok:
+                        errors[i].append(ValidationError(name, rule.value, msg))
+
+            for i, value in zip(active, values):
+                validated[i][name] = value
+
+        return [FormData(fields=fields, valid=not errs, errors=errs) for fields, errs in zip(validated, errors)]
 
-    def _render_field(self, field: FormField, value: Any) -> str:
-        escaped_value = html.escape(str(value)) if value else ""
-        attrs = " ".join(f'{k}="{v}"' for k, v in field.attributes.items())
+    def render_html(self, data: Dict[str, Any] = None) -> str:
+        self._sync_template()
+        if not data:
+            # The <form> tag attributes are plain instance attributes, so key the cache on them too.
+            key = (self.name, self.method, self.action, self.enctype)
+            if self._dirty or self._cached_empty_html is None or key != self._cached_empty_key:
+                self._cached_empty_html = self._render_html({})
+                self._cached_empty_key = key
+                self._dirty = False
+            return self._cached_empty_html
+        return self._render_html(data)
+
+    def _sync_template(self) -> bool:
+        """Recompile the form template if it is missing or stale; returns True when it was rebuilt."""
+        stale = self._compiled_template is None or self._fields_changed()
+        for field in self.fields.values():
+            if field._refresh_render_state():
+                stale = True
+        if stale:
+            self.finalize()
+        return stale
+
+    def _render_html(self, data: Dict[str, Any]) -> str:
+        subs = [f'<form name="{self.name}" method="{self.method}" action="{self.action}" enctype="{self.enctype}">']
+        data_get = data.get
+        append = subs.append
+        render_field_into = self._render_field_into
+
+        for name, field, templated in self._compiled_slots:
+            value = data_get(name, field.default) or ""
+            if templated:
+                append(_as_str(value).translate(_HTML_ESCAPE_TABLE) if value else "")
+            else:
+                out = []
+                render_field_into(out, field, value)
+                append("\n".join(out))
+
+        return self._compiled_template % tuple(subs)
+
+    def _render_field_into(self, out: List[str], field: FormField, value: Any) -> None:
+        attrs = field._attrs_str
         required = " required" if field.required else ""
         disabled = " disabled" if field.disabled else ""
-        readonly = " readonly" if field.readonly else ""
 
-        if field.type == FieldType.HIDDEN:
-            return f'<input type="hidden" name="{field.name}" value="{escaped_value}">'
-
-        parts = ['<div class="form-group">']
+        out.append('<div class="form-group">')
 
-        if field.label and field.type != FieldType.CHECKBOX:
-            parts.append(f'<label for="{field.name}">{field.label}</label>')
+        if field.label and field.type is not FieldType.CHECKBOX:
+            out.append(f'<label for="{field.name}">{field.label}</label>')
 
-        if field.type == FieldType.TEXTAREA:
-            parts.append(f'<textarea name="{field.name}" id="{field.name}" placeholder="{field.placeholder}"{required}{disabled}{readonly} {attrs}>{escaped_value}</textarea>')
-        elif field.type == FieldType.SELECT:
-            parts.append(f'<select name="{field.name}" id="{field.name}"{required}{disabled} {attrs}>')
+        if field.type is FieldType.SELECT:
+            out.append(f'<select name="{field.name}" id="{field.name}"{required}{disabled} {attrs}>')
+            selected_value = _as_str(value)
             for opt in field.options:
-                selected = " selected" if str(opt.value) == str(value) else ""
-                parts.append(f'<option value="{opt.value}"{selected}>{opt.label}</option>')
-            parts.append('</select>')
-        elif field.type == FieldType.CHECKBOX:
-            checked = " checked" if value else ""
-            parts.append(f'<label><input type="checkbox" name="{field.name}" id="{field.name}" value="1"{checked}{disabled} {attrs}> {field.label}</label>')
+                selected = " selected" if _as_str(opt.value) == selected_value else ""
+                out.append(f'<option value="{opt.value}"{selected}>{opt.label}</option>')
+            out.append('</select>')
         else:
-            parts.append(f'<input type="{field.type.value}" name="{field.name}" id="{field.name}" value="{escaped_value}" placeholder="{field.placeholder}"{required}{disabled}{readonly} {attrs}>')
+            checked = " checked" if value else ""
+            out.append(f'<label><input type="checkbox" name="{field.name}" id="{field.name}" value="1"{checked}{disabled} {attrs}> {field.label}</label>')
 
         if field.help_text:
-            parts.append(f'<small>{field.help_text}</small>')
+            out.append(f'<small>{field.help_text}</small>')
 
-        parts.append('</div>')
-        return "\n".join(parts)
+        out.append('</div>')
 
 
 class FormBuilder: